@@ -1,127 +1,343 @@
 import os
 import argparse
-import random
-import time
-from typing import Dict
+import asyncio
+import queue
+import re
+import threading
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 import smtplib
 from email.message import EmailMessage
 
+import numpy as np
+import orjson
 import pandas as pd
-from tqdm import tqdm
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from tqdm.asyncio import tqdm_asyncio
 
 from src.llm_client import LLMClient
 
 
-def enrich_lead(llm: LLMClient, lead: Dict) -> Dict:
-    prompt = (
-        "You are a helpful assistant that enriches a sales lead.\n"
-        f"Known fields: first_name={lead.get('first_name')}, last_name={lead.get('last_name')}, email={lead.get('email')}, company={lead.get('company')}, title={lead.get('title')}, industry={lead.get('industry')}, location={lead.get('location')}.\n"
-        "Fill any missing fields (company, title, industry, location) with short plausible values if blank, and then suggest a concise buyer persona label (one or two words), and a 1-2 sentence persona description.\n"
-        "Return output as lines in the format: company:..., title:..., industry:..., location:..., persona:..., persona_desc:...\n"
-    )
-    out = llm.generate(prompt)
-    parsed = {}
-    for line in out.splitlines():
-        if ":" in line:
-            k, v = line.split(":", 1)
-            parsed[k.strip()] = v.strip()
+# Static instructions go in the system message and the per-lead data in a short user
+# message, so every request shares the same prefix and the provider can reuse its prefill.
+SYSTEM_LEAD = (
+    "You are a sales assistant. The user message is a JSON object describing one sales lead. Do all of the following in one pass:\n"
+    "1. Fill any missing fields (company, title, industry, location) with short plausible values if blank, then suggest a concise buyer persona label (one or two words) and a 1-2 sentence persona description.\n"
+    "2. As an expert sales analyst, give a numeric priority 1-5 (5 highest) and one short reason.\n"
+    "3. Write a short, personalized outreach email (subject + body) in a friendly professional tone. Keep it <100 words in body and include a single short sentence clear call-to-action.\n"
+    "Return only a JSON object with keys: company, title, industry, location, persona, persona_desc, priority, reason, email_subject, email_body."
+)
+
+# Used with --batch-size > 1: enrichment and scoring for several leads per request, then a
+# separate per-lead draft (personalization suffers when drafts are batched).
+SYSTEM_ENRICH_BATCH = (
+    "You are a sales assistant. The user message is a JSON array of sales leads, each with a numeric id. For each lead:\n"
+    "1. Fill any missing fields (company, title, industry, location) with short plausible values if blank, then suggest a concise buyer persona label (one or two words) and a 1-2 sentence persona description.\n"
+    "2. As an expert sales analyst, give a numeric priority 1-5 (5 highest) and one short reason.\n"
+    "Return only a JSON object of the form {\"leads\": [...]} with exactly one object per input lead, each with keys: id (copied from the input lead), company, title, industry, location, persona, persona_desc, priority, reason."
+)
+
+SYSTEM_DRAFT = (
+    "Write a short, personalized outreach email (subject + body) in a friendly professional tone for the sales lead described in the user message (a JSON object). "
+    "Keep it <100 words in body and include a single short sentence clear call-to-action.\n"
+    "Return only a JSON object with keys: email_subject, email_body."
+)
+
+SYSTEM_REPLY = (
+    "You are the prospect receiving the outreach email described in the user message (a JSON object with the email subject, body and your persona). "
+    "Write a short reply (1-3 sentences) that reflects a realistic reaction: interested, maybe later, or not interested."
+)
+
+SYSTEM_CLASSIFY = (
+    "Classify the reply in the user message into one of: Interested, Maybe, Not Interested. Return only the label."
+)
+
+SYSTEM_INSIGHTS = (
+    "You are a smart sales analyst. Given the campaign summary in the user message, write a short markdown report (3-6 paragraphs) with insights, suggestions to improve outreach, and 3 quick action items."
+)
+
+LEAD_FIELDS = ('first_name', 'last_name', 'email', 'company', 'title', 'industry', 'location')
+DRAFT_FIELDS = ('first_name', 'last_name', 'title', 'company', 'persona')
+
+# Completion budgets. Reasoning tokens count against the same limit as the answer, so every
+# JSON-mode call reserves room for them on top of its output: ~160 tokens of JSON per lead in
+# enrich_leads_batch (description + reason included), ~400 for a full lead, ~200 for an email.
+REASONING_TOKENS = 512
+BATCH_TOKENS_PER_LEAD = 160
+
+# Columns the pipeline writes back: lead fields it may fill in, plus its own output.
+RESULT_COLUMNS = (
+    'company', 'title', 'industry', 'location',
+    'persona', 'persona_desc', 'priority', 'priority_reason', 'email_subject', 'email_body',
+    'status', 'response_text', 'response_category',
+)
+
+# Fallback for when the model ignores JSON mode and answers with "key: value" lines.
+FIELD_RE = re.compile(
+    r'^\W*(company|title|industry|location|persona_desc|persona|priority|reason|email_subject|email_body)\W*\s*:\s*"?(.+?)"?,?\s*$',
+    re.M | re.I,
+)
+LABEL_RE = re.compile(r'\b(not interested|interested|maybe)\b', re.I)
+PRIORITY_RE = re.compile(r'\d')
+
+# Whole-word rules tried before asking the LLM to classify a reply. Only a negation directly
+# in front of "interested" ("not interested", "wouldn't be interested") is Not Interested; a
+# bare "interested", replies no rule matches and replies matching rules for different labels
+# ("sounds great, let's chat later") are left to the LLM.
+QUICK_CLASSIFY_RULES = (
+    ('Not Interested', re.compile(
+        r"\b(?:no thanks|remove me|unsubscribe|uninterested)\b|(?:\bnot|n't) (?:be |really |very |that )?interested\b"
+    )),
+    ('Maybe', re.compile(r"\b(?:later|next quarter|not now|busy)\b")),
+    ('Interested', re.compile(r"\b(?:sounds great|let's chat)\b")),
+)
+
+# dtypes applied once to the output frame: nullable small ints for priority, categories for
+# the low-cardinality labels (cheaper memory and value_counts).
+RESULT_DTYPES = {'priority': 'Int8', 'status': 'category', 'response_category': 'category', 'persona': 'category'}
+
+# Redraw progress bars at most once a second; per-task refreshes add up once calls are cached.
+PROGRESS_OPTS = {'mininterval': 1.0, 'smoothing': 0.1}
+
+
+def _parse_json_or_fields(out: str) -> Dict:
+    """Parse a JSON-mode answer; returns {} when it can't be parsed.
+
+    FIELD_RE is only tried on output that isn't JSON at all. Scraping lines out of broken or
+    truncated JSON would pick up fragments such as '"email_body": "Hi Alice' as values.
+    """
+    if out.lstrip().startswith(('{', '[')):
+        try:
+            parsed = orjson.loads(out)
+        except ValueError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+    return {k.lower(): v for k, v in FIELD_RE.findall(out)}
+
+
+def _as_text(value, sep: str = ', ') -> str:
+    """Flatten a parsed JSON value to a string; pyarrow can't write object columns of mixed types."""
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return sep.join(_as_text(v, sep) for v in value if v is not None)
+    return str(value).strip()
+
+
+def _apply_enrichment(lead: Dict, parsed: Dict) -> Dict:
     # fallbacks
-    lead['company'] = lead.get('company') or parsed.get('company') or lead.get('company') or ''
-    lead['title'] = lead.get('title') or parsed.get('title') or ''
-    lead['industry'] = lead.get('industry') or parsed.get('industry') or ''
-    lead['location'] = lead.get('location') or parsed.get('location') or ''
-    lead['persona'] = parsed.get('persona', 'Unknown')
-    lead['persona_desc'] = parsed.get('persona_desc', '')
+    for field in ('company', 'title', 'industry', 'location'):
+        lead[field] = _as_text(lead.get(field)) or _as_text(parsed.get(field))
+    lead['persona'] = _as_text(parsed.get('persona')) or 'Unknown'
+    lead['persona_desc'] = _as_text(parsed.get('persona_desc'))
+    match = PRIORITY_RE.search(str(parsed.get('priority', '')))
+    lead['priority'] = int(match.group(0)) if match else 3
+    lead['priority_reason'] = _as_text(parsed.get('reason'))
     return lead
 
 
-def score_lead(llm: LLMClient, lead: Dict) -> Dict:
-    prompt = (
-        "You are an expert sales analyst. Given this lead, provide a numeric priority 1-5 (5 highest) and one short reason.\n"
-        f"Lead: first_name={lead.get('first_name')}, last_name={lead.get('last_name')}, company={lead.get('company')}, title={lead.get('title')}, industry={lead.get('industry')}, persona={lead.get('persona')}.\n"
-        "Return: priority: <1-5>\nreason: <one sentence>"
-    )
-    out = llm.generate(prompt)
-    priority = 3
-    reason = ''
-    for line in out.splitlines():
-        if line.lower().strip().startswith('priority'):
-            try:
-                priority = int(''.join(filter(str.isdigit, line)))
-            except Exception:
-                priority = 3
-        if line.lower().strip().startswith('reason'):
-            _, r = line.split(':', 1)
-            reason = r.strip()
-    lead['priority'] = priority
-    lead['priority_reason'] = reason
+def _apply_email(lead: Dict, parsed: Dict) -> Dict:
+    # Raise rather than fall back to the raw output, so process_lead never queues a bad email.
+    body = _as_text(parsed.get('email_body'), sep='\n\n')
+    if not body:
+        raise ValueError('no email_body in LLM response')
+    lead['email_subject'] = _as_text(parsed.get('email_subject')) or f"Quick note for {lead.get('first_name')}"
+    lead['email_body'] = body
     return lead
 
 
-def draft_email(llm: LLMClient, lead: Dict) -> Dict:
-    prompt = (
-        "Write a short, personalized outreach email (subject + body) in a friendly professional tone. Keep it <100 words in body. \n"
-        f"Lead: {lead.get('first_name')} {lead.get('last_name')}, title={lead.get('title')}, company={lead.get('company')}, persona={lead.get('persona')}.\n"
-        "Include a single short sentence clear call-to-action.\n"
-        "Return exactly as:\nSubject: <subject line>\n\nBody: <email body>"
+async def process_lead_single_call(llm: LLMClient, lead: Dict) -> Dict:
+    """Enrich, score and draft the outreach email for a lead with one JSON-mode LLM call."""
+    lead_json = orjson.dumps({k: lead.get(k) for k in LEAD_FIELDS}).decode()
+    out = await llm.agenerate(
+        lead_json,
+        system=SYSTEM_LEAD,
+        max_new_tokens=REASONING_TOKENS + 400,
+        response_format={"type": "json_object"},
+        temperature=0,
+        require_complete=True,
     )
-    out = llm.generate(prompt)
-    subject = ''
-    body = ''
-    if 'Subject:' in out:
-        parts = out.split('Subject:', 1)[1]
-        if 'Body:' in parts:
-            subj, bod = parts.split('Body:', 1)
-            subject = subj.strip()
-            body = bod.strip()
+    parsed = _parse_json_or_fields(out)
+    _apply_enrichment(lead, parsed)
+    return _apply_email(lead, parsed)
+
+
+async def enrich_leads_batch(llm: LLMClient, leads: List[Dict]) -> List[Dict]:
+    """Enrich and score several leads with one LLM call; results are matched back by the id echoed for each lead.
+
+    Raises ValueError when the response can't be parsed; leads missing from a short response
+    are marked as errors rather than given default values.
+    """
+    leads_json = orjson.dumps([dict(id=i, **{k: lead.get(k) for k in LEAD_FIELDS}) for i, lead in enumerate(leads)]).decode()
+    out = await llm.agenerate(
+        leads_json,
+        system=SYSTEM_ENRICH_BATCH,
+        max_new_tokens=REASONING_TOKENS + BATCH_TOKENS_PER_LEAD * len(leads),
+        response_format={"type": "json_object"},
+        temperature=0,
+        require_complete=True,
+    )
+    try:
+        results = orjson.loads(out).get('leads')
+    except (ValueError, AttributeError):
+        results = None
+    if not isinstance(results, list):
+        raise ValueError('could not parse batch enrichment response')
+    # A dropped or reordered lead must not shift everyone else's results; the first result for each id wins.
+    by_id = {}
+    for result in results:
+        if isinstance(result, dict):
+            by_id.setdefault(str(result.get('id')), result)
+    for i, lead in enumerate(leads):
+        if str(i) in by_id:
+            _apply_enrichment(lead, by_id[str(i)])
         else:
-            subject = parts.strip()
-    else:
-        # fallback: whole text is body
-        body = out.strip()
-        subject = f"Quick note for {lead.get('first_name')}"
-    lead['email_subject'] = subject
-    lead['email_body'] = body
-    return lead
+            lead['status'] = 'error: no result for this lead in batch enrichment response'
+    return leads
+
+
+async def draft_email(llm: LLMClient, lead: Dict) -> Dict:
+    lead_json = orjson.dumps({k: lead.get(k) for k in DRAFT_FIELDS}).decode()
+    out = await llm.agenerate(
+        lead_json,
+        system=SYSTEM_DRAFT,
+        max_new_tokens=REASONING_TOKENS + 200,
+        response_format={"type": "json_object"},
+        require_complete=True,
+    )
+    return _apply_email(lead, _parse_json_or_fields(out))
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+class SMTPConnection:
+    """A single SMTP connection reused for every message instead of one handshake per email.
 
+    Connects lazily, checks the connection with NOOP every ``noop_every`` messages and
+    reconnects when the server has dropped it.
+    """
 
-def send_email(smtp_host: str, smtp_port: int, from_addr: str, to_addr: str, subject: str, body: str):
+    def __init__(self, host: str, port: int, noop_every: int = 20):
+        self.host = host
+        self.port = port
+        self.noop_every = noop_every
+        self._smtp = None
+        self._sent = 0
+
+    def _connect(self):
+        self.close()
+        self._smtp = smtplib.SMTP(self.host, self.port)
+
+    def _is_alive(self) -> bool:
+        try:
+            return self._smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send_message(self, msg: EmailMessage):
+        if self._smtp is None:
+            self._connect()
+        elif self.noop_every and self._sent % self.noop_every == 0 and not self._is_alive():
+            self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._smtp.send_message(msg)
+        self._sent += 1
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+def send_email(smtp: SMTPConnection, from_addr: str, to_addr: str, subject: str, body: str):
     msg = EmailMessage()
     msg['From'] = from_addr
     msg['To'] = to_addr
     msg['Subject'] = subject
     msg.set_content(body)
-    with smtplib.SMTP(smtp_host, smtp_port) as s:
-        s.send_message(msg)
-
-
-def simulate_and_classify_responses(llm: LLMClient, lead: Dict) -> Dict:
-    # Simulate a reply for demo purposes for some leads
-    # We'll simulate replies for higher-priority leads with some randomness
-    simulate = False
-    if lead.get('priority', 3) >= 4 and random.random() < 0.8:
-        simulate = True
-    elif lead.get('priority', 3) == 3 and random.random() < 0.25:
-        simulate = True
-
-    if not simulate:
-        lead['status'] = 'no_response'
-        lead['response_text'] = ''
-        lead['response_category'] = 'No Response'
-        return lead
+    smtp.send_message(msg)
+
+
+class EmailSender:
+    """Sends emails from a background thread so SMTP latency stays off the LLM pipeline.
+
+    put() only enqueues; a daemon thread drains the queue over the shared SMTPConnection and
+    records each outcome in ``results`` (lead id -> None on success, or the exception).
+    ``results`` is complete once join() returns.
+    """
+
+    def __init__(self, smtp: SMTPConnection, from_addr: str):
+        self.smtp = smtp
+        self.from_addr = from_addr
+        self.results: Dict[int, Optional[Exception]] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='smtp-sender', daemon=True)
+        self._thread.start()
+
+    def put(self, lead_id: int, to_addr: str, subject: str, body: str):
+        self._queue.put((lead_id, to_addr, subject, body))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            lead_id, to_addr, subject, body = item
+            try:
+                send_email(self.smtp, self.from_addr, to_addr, subject, body)
+                error = None
+            except Exception as e:
+                error = e
+            with self._lock:
+                self.results[lead_id] = error
+
+    def join(self):
+        """Wait until every queued email has been attempted."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def select_leads_to_simulate(leads: List[Dict], rng: np.random.Generator) -> np.ndarray:
+    """Decide, for all leads at once, which ones get a simulated reply for the demo.
+
+    Higher-priority leads are more likely to reply: 80% for priority >= 4, 25% for priority 3.
+    """
+    priorities = np.array([lead.get('priority', 3) for lead in leads], dtype=np.int64)
+    rolls = rng.random(len(leads))
+    return ((priorities >= 4) & (rolls < 0.8)) | ((priorities == 3) & (rolls < 0.25))
+
+
+def quick_classify(reply: str) -> Optional[str]:
+    """Classify a reply by keyword, or return None when no rule (or more than one label) matches."""
+    r = reply.lower().replace('\u2019', "'")
+    labels = {label for label, pattern in QUICK_CLASSIFY_RULES if pattern.search(r)}
+    return labels.pop() if len(labels) == 1 else None
 
-    prompt_reply = (
-        "You are the prospect receiving this email. Write a short reply (1-3 sentences) that reflects a realistic reaction: interested, maybe later, or not interested.\n"
-        f"Email subject: {lead.get('email_subject')}\nEmail body: {lead.get('email_body')}\nPersona: {lead.get('persona')}\n"
-    )
-    reply = llm.generate(prompt_reply)
-    # classify the reply
-    prompt_class = (
-        "Classify the following reply into one of: Interested, Maybe, Not Interested. Return only the one-word label.\n"
-        f"Reply: {reply}\n"
-    )
-    label = llm.generate(prompt_class)
-    label_clean = label.splitlines()[0].strip().split()[0]
+
+async def simulate_and_classify_responses(llm: LLMClient, lead: Dict) -> Dict:
+    """Simulate the prospect's reply to a lead's email and classify it."""
+    email_json = orjson.dumps({'email_subject': lead.get('email_subject'), 'email_body': lead.get('email_body'), 'persona': lead.get('persona')}).decode()
+    reply = await llm.agenerate(email_json, system=SYSTEM_REPLY)
+    # classify the reply, only asking the LLM when the keyword rules can't tell
+    label_clean = quick_classify(reply)
+    if label_clean is None:
+        label = await llm.agenerate(reply, system=SYSTEM_CLASSIFY, temperature=0, semantic=True)
+        match = LABEL_RE.search(label)
+        label_clean = match.group(1).title() if match else label.strip()
 
     lead['status'] = 'replied'
     lead['response_text'] = reply
@@ -129,38 +345,119 @@ def simulate_and_classify_responses(llm: LLMClient, lead: Dict) -> Dict:
     return lead
 
 
+async def process_lead(
+    llm: LLMClient,
+    sender: EmailSender,
+    lead_id: int,
+    lead: Dict,
+    sem: asyncio.Semaphore,
+    args: argparse.Namespace,
+) -> Dict:
+    if str(lead.get('status', '')).startswith('error'):
+        return lead
+    async with sem:
+        try:
+            if args.batch_size > 1:
+                # enrichment and scoring were already done in batches
+                lead = await draft_email(llm, lead)
+            else:
+                lead = await process_lead_single_call(llm, lead)
+            # send email in the background; the outcome is reconciled in process_leads
+            sender.put(lead_id, lead.get('email'), lead['email_subject'], lead['email_body'])
+            lead['status'] = 'queued'
+        except Exception as e:
+            lead['status'] = f'error: {e}'
+    return lead
+
+
+async def enrich_batch(llm: LLMClient, leads: List[Dict], sem: asyncio.Semaphore) -> List[Dict]:
+    async with sem:
+        try:
+            await enrich_leads_batch(llm, leads)
+        except Exception as e:
+            for lead in leads:
+                lead['status'] = f'error: {e}'
+    return leads
+
+
+async def simulate_reply(llm: LLMClient, lead: Dict, sem: asyncio.Semaphore) -> Dict:
+    async with sem:
+        try:
+            lead = await simulate_and_classify_responses(llm, lead)
+        except Exception as e:
+            lead['status'] = f'error: {e}'
+    return lead
+
+
+async def process_leads(llm: LLMClient, smtp: SMTPConnection, rows: List[Dict], args: argparse.Namespace) -> List[Dict]:
+    """Run every lead through the pipeline concurrently, at most args.concurrency at a time.
+
+    Leads are enriched, scored, drafted and sent first; replies are then simulated for a
+    randomly chosen subset of the leads that made it through. Rate limiting is left to the
+    semaphore and the client's retry/backoff on 429s.
+    """
+    try:
+        return await _process_leads(llm, smtp, rows, args)
+    finally:
+        # The async client's connection pool belongs to this event loop; close it before
+        # asyncio.run() shuts the loop down.
+        await llm.aclose()
+
+
+async def _process_leads(llm: LLMClient, smtp: SMTPConnection, rows: List[Dict], args: argparse.Namespace) -> List[Dict]:
+    sem = asyncio.Semaphore(args.concurrency)
+    if args.batch_size > 1:
+        tasks = [enrich_batch(llm, chunk, sem) for chunk in chunked(rows, args.batch_size)]
+        await tqdm_asyncio.gather(*tasks, desc='Enriching leads', **PROGRESS_OPTS)
+
+    sender = EmailSender(smtp, args.from_addr)
+    try:
+        tasks = [process_lead(llm, sender, i, lead, sem, args) for i, lead in enumerate(rows)]
+        processed = await tqdm_asyncio.gather(*tasks, desc='Processing leads', **PROGRESS_OPTS)
+
+        ok = np.array([not str(lead.get('status', '')).startswith('error') for lead in processed], dtype=bool)
+        simulate_mask = ok & select_leads_to_simulate(processed, np.random.default_rng())
+        for i in np.flatnonzero(ok & ~simulate_mask):
+            processed[i].update(status='no_response', response_text='', response_category='No Response')
+
+        tasks = [simulate_reply(llm, processed[i], sem) for i in np.flatnonzero(simulate_mask)]
+        await tqdm_asyncio.gather(*tasks, desc='Simulating replies', **PROGRESS_OPTS)
+    finally:
+        # join() blocks, so wait for the remaining sends off the event loop
+        await asyncio.to_thread(sender.join)
+
+    for i, error in sender.results.items():
+        if error is not None:
+            processed[i]['status'] = f'send_error: {error}'
+        elif processed[i]['status'] == 'queued':
+            processed[i]['status'] = 'sent'
+    return processed
+
+
 def generate_report(llm: LLMClient, df: pd.DataFrame, out_path: str):
     total = len(df)
     sent = df['status'].isin(['sent','replied']).sum()
     replied = (df['status'] == 'replied').sum()
-    # Ensure priority is treated as numeric (some rows may contain empty strings or error text)
-    # Coerce non-numeric values to NaN and compute mean safely.
-    if 'priority' in df.columns:
-        priorities = pd.to_numeric(df['priority'], errors='coerce')
-        avg_priority = float(priorities.mean(skipna=True)) if not priorities.empty else 0.0
+    # priority is already numeric (see RESULT_DTYPES); rows that failed are <NA> and skipped.
+    if 'priority' in df.columns and df['priority'].notna().any():
+        avg_priority = float(df['priority'].mean())
     else:
         avg_priority = 0.0
 
-    persona_counts = df.get('persona', pd.Series([], dtype=object)).fillna('Unknown').value_counts().to_dict()
+    persona_counts = df.get('persona', pd.Series([], dtype=object)).fillna('Unknown').value_counts()
 
-    summary = (
+    # Collect the pieces and join once rather than growing a string in a loop.
+    parts = [
         f"Campaign summary:\n\nTotal leads: {total}\nSent: {sent}\nReplied: {replied}\nAverage priority: {avg_priority:.2f}\n\nPersona breakdown:\n"
-    )
-    for p, c in persona_counts.items():
-        summary += f"- {p}: {c}\n"
+    ]
+    parts.extend(f"- {p}: {c}\n" for p, c in persona_counts.items())
+    summary = ''.join(parts)
 
     # Ask LLM for insights
-    prompt_insights = (
-        "You are a smart sales analyst. Given the campaign summary below, write a short markdown report (3-6 paragraphs) with insights, suggestions to improve outreach, and 3 quick action items.\n\n"
-        f"{summary}"
-    )
-    insights = llm.generate(prompt_insights, max_new_tokens=256)
+    insights = llm.generate(summary, system=SYSTEM_INSIGHTS, max_new_tokens=256)
 
     with open(out_path, 'w', encoding='utf-8') as f:
-        f.write('# Campaign Summary\n\n')
-        f.write(summary + '\n\n')
-        f.write('## AI Insights\n\n')
-        f.write(insights)
+        f.writelines(('# Campaign Summary\n\n', summary, '\n\n', '## AI Insights\n\n', insights))
 
 
 def main():
@@ -172,43 +469,37 @@ def main():
     parser.add_argument('--from-addr', default='noreply@example.com')
     parser.add_argument('--model', default='openai/gpt-oss-20b')
     parser.add_argument('--api-key', default=None, help='Groq API key (also reads GROQ_API_KEY env var)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Maximum number of leads processed concurrently')
+    parser.add_argument('--batch-size', type=int, default=1, help='Enrich and score this many leads per LLM call, then draft emails per lead (1 = one combined call per lead)')
+    parser.add_argument('--cache-path', default='.llm_cache.sqlite', help='SQLite file for cached LLM responses (empty string disables caching)')
+    parser.add_argument('--semantic-cache', default=None, help='Directory for the embedding-similarity cache of reply classifications (requires fastembed and faiss-cpu)')
     args = parser.parse_args()
 
-    llm = LLMClient(api_key=args.api_key, model=args.model)
+    llm = LLMClient(api_key=args.api_key, model=args.model, cache_path=args.cache_path or None, semantic_cache_path=args.semantic_cache)
 
     df = pd.read_csv(args.csv)
 
-    # Ensure output columns exist
-    for col in ['persona', 'persona_desc', 'priority', 'priority_reason', 'email_subject', 'email_body', 'status', 'response_text', 'response_category']:
-        if col not in df.columns:
-            df[col] = ''
-
-    rows = df.to_dict(orient='records')
-    processed = []
-    for lead in tqdm(rows, desc='Processing leads'):
-        try:
-            lead = enrich_lead(llm, lead)
-            lead = score_lead(llm, lead)
-            lead = draft_email(llm, lead)
-            # send email
-            try:
-                send_email(args.smtp_host, args.smtp_port, args.from_addr, lead.get('email'), lead['email_subject'], lead['email_body'])
-                lead['status'] = 'sent'
-            except Exception as e:
-                lead['status'] = f'send_error: {e}'
-            # simulate and classify responses for demo
-            lead = simulate_and_classify_responses(llm, lead)
-        except Exception as e:
-            lead['status'] = f'error: {e}'
-        processed.append(lead)
-        # brief pause to avoid HF rate limits
-        time.sleep(0.5)
-
-    out_df = pd.DataFrame(processed)
-    out_df.to_csv(args.out, index=False)
+    # Only the fields the prompts need go through Python dicts; everything else stays in df.
+    # Blank cells come back as NaN, which is truthy and would never be filled in; use None.
+    leads = df[[c for c in LEAD_FIELDS if c in df.columns]].astype(object)
+    rows = leads.where(leads.notna(), None).to_dict(orient='records')
+    smtp = SMTPConnection(args.smtp_host, args.smtp_port)
+    try:
+        processed = asyncio.run(process_leads(llm, smtp, rows, args))
+    finally:
+        smtp.close()
+
+    # Write results back one column at a time instead of rebuilding the frame from dicts.
+    for col in RESULT_COLUMNS:
+        df[col] = [lead.get(col) for lead in processed]
+    df['persona'] = df['persona'].fillna('Unknown')
+    df = df.astype(RESULT_DTYPES)
+    # pyarrow's C++ CSV writer is much faster than DataFrame.to_csv for the wide text columns here.
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), args.out)
 
     os.makedirs('reports', exist_ok=True)
-    generate_report(llm, out_df, 'reports/campaign_summary.md')
+    generate_report(llm, df, 'reports/campaign_summary.md')
+    llm.close()
 
     print('\nDone. Updated CSV at', args.out)
     print('Report at reports/campaign_summary.md')
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Optional dependencies for the semantic cache; only needed when it is enabled.
+try:
+    import faiss
+    import numpy as np
+    from fastembed import TextEmbedding
+except Exception as e:
+    faiss = None  # type: ignore
+    np = None  # type: ignore
+    TextEmbedding = None  # type: ignore
+
+
+class ResponseCache:
+    """Exact-match LLM response cache backed by a SQLite table.
+
+    Keys are SHA-256 digests of the request parameters; entries older than
+    ``ttl`` seconds are treated as misses.
+
+    Usage:
+        cache = ResponseCache(".llm_cache.sqlite")
+        key = cache.make_key(model, temperature, max_new_tokens, prompt)
+        text = cache.get(key)
+        if text is None:
+            text = ...
+            cache.set(key, text)
+    """
+
+    def __init__(self, path: str, ttl: int = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        # The pipeline calls into the cache from several threads/coroutines, so share one
+        # connection and serialize access with a lock.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT, created_at INT)"
+            )
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        cutoff = int(time.time()) - self.ttl
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM cache WHERE key = ? AND created_at > ?", (key, cutoff)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, int(time.time())),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SemanticCache:
+    """Similarity-based LLM response cache for prompts that differ only in surface details.
+
+    Prompts are embedded with a small sentence-transformers model (via fastembed) and kept
+    in FAISS inner-product indexes over L2-normalized vectors, so search scores are cosine
+    similarities. Each ``namespace`` (model and request parameters) has its own index, and a
+    lookup is a hit when a cached prompt younger than ``ttl`` seconds scores >= ``threshold``.
+
+    The indexes and responses are persisted to ``path`` (a directory) by save(); expired
+    entries are dropped at that point.
+    """
+
+    # How many neighbours to check, so a just-expired nearest entry doesn't hide a fresh one.
+    SEARCH_K = 8
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.95,
+        ttl: int = 7 * 24 * 3600,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+    ):
+        if faiss is None or TextEmbedding is None:
+            raise ImportError(
+                "The semantic cache needs the 'fastembed' and 'faiss-cpu' packages. Install them or disable the semantic cache."
+            )
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._embedder = TextEmbedding(model_name)
+        self._entries_path = os.path.join(path, "entries.pkl")
+        # namespace -> index, and namespace -> [(response, created_at)] aligned with the index ids
+        self._indexes: Dict[str, "faiss.Index"] = {}
+        self._entries: Dict[str, List[Tuple[str, int]]] = {}
+        if os.path.exists(self._entries_path):
+            with open(self._entries_path, "rb") as f:
+                self._entries = pickle.load(f)
+            for namespace in self._entries:
+                self._indexes[namespace] = faiss.read_index(self._index_path(namespace))
+
+    def _index_path(self, namespace: str) -> str:
+        return os.path.join(self.path, f"index-{namespace}.faiss")
+
+    def _embed(self, text: str):
+        vec = np.asarray(next(iter(self._embedder.embed([text]))), dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
+
+    def get(self, namespace: str, prompt: str) -> Optional[str]:
+        vec = self._embed(prompt)
+        cutoff = int(time.time()) - self.ttl
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None or index.ntotal == 0:
+                return None
+            sims, ids = index.search(vec, min(self.SEARCH_K, index.ntotal))
+            entries = self._entries[namespace]
+            for sim, idx in zip(sims[0], ids[0]):
+                if idx < 0 or sim < self.threshold:
+                    break
+                response, created_at = entries[idx]
+                if created_at > cutoff:
+                    return response
+        return None
+
+    def set(self, namespace: str, prompt: str, response: str) -> None:
+        vec = self._embed(prompt)
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = faiss.IndexFlatIP(vec.shape[1])
+                self._entries[namespace] = []
+            index.add(vec)
+            self._entries[namespace].append((response, int(time.time())))
+
+    def save(self) -> None:
+        cutoff = int(time.time()) - self.ttl
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            for namespace, index in list(self._indexes.items()):
+                entries = self._entries[namespace]
+                keep = [i for i, (_, created_at) in enumerate(entries) if created_at > cutoff]
+                if len(keep) < len(entries):
+                    # Rebuild without the expired rows so ids stay aligned with entries.
+                    vectors = index.reconstruct_n(0, index.ntotal)[keep]
+                    index = self._indexes[namespace] = faiss.IndexFlatIP(index.d)
+                    if keep:
+                        index.add(vectors)
+                    self._entries[namespace] = [entries[i] for i in keep]
+                if not keep:
+                    del self._indexes[namespace], self._entries[namespace]
+                    if os.path.exists(self._index_path(namespace)):
+                        os.remove(self._index_path(namespace))
+                    continue
+                faiss.write_index(index, self._index_path(namespace))
+            with open(self._entries_path, "wb") as f:
+                pickle.dump(self._entries, f)
@@ -1,11 +1,58 @@
+import asyncio
 import os
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from src.llm_cache import ResponseCache, SemanticCache
 
 # Try importing Groq SDK. The package should be installed via requirements.txt.
 try:
-    from groq import Groq
+    import httpx
+    from groq import APIConnectionError, APIStatusError, AsyncGroq, Groq
 except Exception as e:
     Groq = None  # type: ignore
+    AsyncGroq = None  # type: ignore
+    APIConnectionError = APIStatusError = None  # type: ignore
+
+MAX_RETRY_AFTER = 60.0
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """The transient failures the Groq SDK itself retries: dropped connections and timeouts,
+    408/409/429 and 5xx responses."""
+    if APIConnectionError is not None and isinstance(exc, APIConnectionError):
+        return True
+    if APIStatusError is not None and isinstance(exc, APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS_CODES or exc.status_code >= 500
+    return False
+
+
+_backoff = wait_exponential_jitter(initial=0.5, max=8)
+
+
+def wait_retry_after(retry_state) -> float:
+    """Wait as long as the server's Retry-After header asks, else back off exponentially with jitter."""
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return min(max(float(value) * scale, 0.0), MAX_RETRY_AFTER)
+            except ValueError:
+                pass  # HTTP-date form; fall back to our own backoff
+    return _backoff(retry_state)
+
+
+# Back off only when a request fails transiently, instead of pausing between every request.
+retry_on_transient_error = retry(
+    retry=retry_if_exception(is_retryable),
+    wait=wait_retry_after,
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
 
 
 class LLMClient:
@@ -14,11 +61,26 @@ class LLMClient:
     Usage:
         llm = LLMClient(api_key="...")
         text = llm.generate(prompt)
+        text = await llm.agenerate(prompt)  # from inside an event loop
+
+    Calls made with temperature=0 are deterministic and are served from an on-disk
+    SQLite cache when cache_path is set (pass cache_path=None to disable). Setting
+    semantic_cache_path additionally enables an embedding-similarity cache for calls
+    made with semantic=True.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "openai/gpt-oss-20b"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "openai/gpt-oss-20b",
+        cache_path: Optional[str] = ".llm_cache.sqlite",
+        cache_ttl: int = 7 * 24 * 3600,
+        semantic_cache_path: Optional[str] = None,
+    ):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         self.model = model
+        self.cache = ResponseCache(cache_path, ttl=cache_ttl) if cache_path else None
+        self.semantic_cache = SemanticCache(semantic_cache_path, ttl=cache_ttl) if semantic_cache_path else None
         if Groq is None:
             raise ImportError(
                 "groq package is not installed. Please install requirements.txt which includes 'groq'."
@@ -32,40 +94,187 @@ class LLMClient:
         # Create the Groq client. The SDK reads the GROQ_API_KEY env var.
         try:
             # Prefer calling Groq() without attempting to pass api_key (some SDKs require env var)
-            self.client = Groq()
+            # Retries are handled by retry_on_transient_error, so the SDK's own are disabled.
+            # Both clients use pooled HTTP/2 connections so concurrent requests share warm
+            # TLS connections instead of opening new ones.
+            limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            timeout = httpx.Timeout(60.0)
+            self.client = Groq(
+                max_retries=0,
+                http_client=httpx.Client(http2=True, limits=limits, timeout=timeout),
+            )
+            self.aclient = AsyncGroq(
+                max_retries=0,
+                http_client=httpx.AsyncClient(http2=True, limits=limits, timeout=timeout),
+            )
         except Exception as e:
             raise RuntimeError(
                 "Failed to initialize Groq client. Make sure the GROQ_API_KEY environment variable is set or pass the API key to LLMClient(api_key=...). Original error: " + str(e)
             )
 
-    def generate(self, prompt: str, max_new_tokens: int = 128, timeout: int = 60) -> str:
+    def generate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        timeout: int = 60,
+        response_format: Optional[Dict] = None,
+        temperature: float = 0.2,
+        semantic: bool = False,
+        system: Optional[str] = None,
+        require_complete: bool = False,
+    ) -> str:
         """Call Groq chat completions API in non-streaming mode and return text result.
 
         This tries to be resilient to slight differences in the SDK return shape.
+        Pass response_format={"type": "json_object"} to request JSON mode. Results of
+        temperature=0 calls are cached; semantic=True also lets near-duplicate prompts hit
+        the semantic cache, so only use it where outputs don't depend on the exact wording.
+        Static instructions belong in ``system`` so that every request shares the same
+        prefix and can benefit from provider-side prompt caching. With require_complete=True
+        a truncated or empty answer raises RuntimeError instead of being returned.
         """
-        messages = [{"role": "user", "content": prompt}]
+        key, namespace = self._cache_keys(prompt, system, max_new_tokens, response_format, temperature, semantic)
+        cached = self._cache_lookup(key, namespace, prompt)
+        if cached is not None:
+            return cached
+        kwargs, fallback_kwargs = self._request_kwargs(prompt, system, max_new_tokens, response_format, temperature)
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.2,
-                max_completion_tokens=max_new_tokens,
-                top_p=1,
-                reasoning_effort="medium",
-                stream=False,
-                stop=None,
-            )
+            resp = self._create(**kwargs)
         except TypeError:
             # Some older/newer SDKs may use slightly different parameter names.
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.2,
-                max_tokens=max_new_tokens,
-                top_p=1,
-                stream=False,
-            )
+            resp = self._create(**fallback_kwargs)
+        return self._finish(resp, key, namespace, prompt, require_complete)
+
+    async def agenerate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        timeout: int = 60,
+        response_format: Optional[Dict] = None,
+        temperature: float = 0.2,
+        semantic: bool = False,
+        system: Optional[str] = None,
+        require_complete: bool = False,
+    ) -> str:
+        """Async counterpart of generate() backed by the AsyncGroq client."""
+        key, namespace = self._cache_keys(prompt, system, max_new_tokens, response_format, temperature, semantic)
+        # Cache reads/writes hit SQLite and (for the semantic cache) an embedding model; keep
+        # them off the event loop.
+        if key is not None or namespace is not None:
+            cached = await asyncio.to_thread(self._cache_lookup, key, namespace, prompt)
+            if cached is not None:
+                return cached
+        kwargs, fallback_kwargs = self._request_kwargs(prompt, system, max_new_tokens, response_format, temperature)
+        try:
+            resp = await self._acreate(**kwargs)
+        except TypeError:
+            resp = await self._acreate(**fallback_kwargs)
+        if key is None and namespace is None:
+            return self._finish(resp, key, namespace, prompt, require_complete)
+        return await asyncio.to_thread(self._finish, resp, key, namespace, prompt, require_complete)
+
+    @retry_on_transient_error
+    def _create(self, **kwargs):
+        return self.client.chat.completions.create(**kwargs)
+
+    @retry_on_transient_error
+    async def _acreate(self, **kwargs):
+        return await self.aclient.chat.completions.create(**kwargs)
+
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str]) -> List[Dict]:
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return messages
+
+    def _request_kwargs(
+        self, prompt: str, system: Optional[str], max_new_tokens: int, response_format: Optional[Dict], temperature: float
+    ) -> Tuple[Dict, Dict]:
+        """Build the chat.completions.create arguments, plus a variant for SDKs with older parameter names."""
+        base = dict(model=self.model, messages=self._messages(prompt, system), temperature=temperature, top_p=1, stream=False)
+        if response_format:
+            base["response_format"] = response_format
+        kwargs = dict(base, max_completion_tokens=max_new_tokens, reasoning_effort="medium", stop=None)
+        fallback_kwargs = dict(base, max_tokens=max_new_tokens)
+        return kwargs, fallback_kwargs
+
+    def _cache_keys(
+        self,
+        prompt: str,
+        system: Optional[str],
+        max_new_tokens: int,
+        response_format: Optional[Dict],
+        temperature: float,
+        semantic: bool,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Return (exact cache key, semantic cache namespace); either is None when not applicable."""
+        # Only deterministic calls are worth caching.
+        if temperature != 0:
+            return None, None
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model, temperature, max_new_tokens, response_format, system, prompt)
+        namespace = None
+        if semantic and self.semantic_cache is not None:
+            # Only the user message is embedded; everything else must match exactly.
+            namespace = ResponseCache.make_key(self.model, max_new_tokens, response_format, system)
+        return key, namespace
+
+    def _cache_lookup(self, key: Optional[str], namespace: Optional[str], prompt: str) -> Optional[str]:
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if namespace is not None:
+            return self.semantic_cache.get(namespace, prompt)
+        return None
+
+    def _finish(
+        self, resp, key: Optional[str], namespace: Optional[str], prompt: str, require_complete: bool = False
+    ) -> str:
+        """Extract the text from a response and store it in the caches."""
+        text = self._extract_text(resp)
+        complete = self._is_complete(resp)
+        if require_complete and not complete:
+            raise RuntimeError("LLM response was truncated or empty")
+        # Never cache truncated or empty answers (or the str(resp) fallback), or they'd be replayed on every run.
+        if complete:
+            if key is not None:
+                self.cache.set(key, text)
+            if namespace is not None:
+                self.semantic_cache.set(namespace, prompt, text)
+        return text
+
+    async def aclose(self) -> None:
+        """Close the async client; call from inside the event loop that used it."""
+        await self.aclient.close()
+
+    def close(self) -> None:
+        self.client.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.semantic_cache is not None:
+            self.semantic_cache.save()
+
+    @staticmethod
+    def _is_complete(resp) -> bool:
+        """True when the first choice finished normally (finish_reason 'stop') with non-empty content."""
+        try:
+            if isinstance(resp, dict):
+                choice = (resp.get("choices") or [{}])[0]
+                content = (choice.get("message") or {}).get("content")
+                finish_reason = choice.get("finish_reason")
+            else:
+                choice = resp.choices[0]
+                content = getattr(getattr(choice, "message", None), "content", None)
+                finish_reason = getattr(choice, "finish_reason", None)
+        except (AttributeError, IndexError, TypeError):
+            return False
+        return finish_reason == "stop" and bool(content and content.strip())
 
+    @staticmethod
+    def _extract_text(resp) -> str:
         # Extract text from response (supports object or dict-like responses)
         try:
             # SDK object with choices -> message -> content